@@ -55,7 +55,7 @@ def main():
     # ─────────────────────────────────────────────
     # Read everything (e.g., for debugging or exporting)
     # ─────────────────────────────────────────────
-    all_settings = settings_db.get_all()
+    all_settings = dict(settings_db.get_all())
     print("All settings:", all_settings)
 
 
@@ -1,42 +1,1711 @@
+import atexit
+import contextlib
+import hashlib
+import itertools
 import json
+import math
+import mmap
+import os
+import pickle
+import platform
+import re
+import sys
 from pathlib import Path
-from typing import Any
+from types import MappingProxyType
+from typing import Any, Callable, Iterator, Literal, Optional, Union
 import threading
+import uuid
+import zlib
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the platform
+    orjson = None
+
+try:
+    import liburing
+except ImportError:  # pragma: no cover - depends on the platform
+    liburing = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+
+# Default for `expected_hash` arguments, distinct from None ("key absent").
+_UNCHECKED = object()
+
+
+class StalePrecondition(Exception):
+    """
+    Raised when a conditional write finds that the value changed since it was read.
+    """
+
+
+def _needs_stdlib(data: Any) -> bool:
+    """
+    Return True if `data` holds, at any depth, a NaN or infinite float or a
+    `uuid.UUID`, which `orjson` encodes differently from `json`.
+    """
+    if isinstance(data, float):
+        return not math.isfinite(data)
+    if isinstance(data, uuid.UUID):
+        return True
+    if isinstance(data, dict):
+        return any(
+            _needs_stdlib(key) or _needs_stdlib(value) for key, value in data.items()
+        )
+    if isinstance(data, (list, tuple)):
+        return any(_needs_stdlib(value) for value in data)
+    return False
+
+
+def _orjson_default(value: Any) -> Any:
+    """
+    Reject the types `orjson` passes through, which `json` cannot encode either.
+    """
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+# Hand datetimes, dataclasses and subclasses of built-in types to `default`
+# instead of letting orjson encode them in ways the json module does not.
+_ORJSON_PASSTHROUGH = (
+    orjson.OPT_PASSTHROUGH_DATETIME
+    | orjson.OPT_PASSTHROUGH_DATACLASS
+    | orjson.OPT_PASSTHROUGH_SUBCLASS
+    if orjson is not None
+    else 0
+)
+
+# How orjson writes a `uuid.UUID`.
+_UUID_RE = re.compile(rb'"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"')
+
+
+def _orjson_dumps(data: Any, option: int) -> Optional[bytes]:
+    """
+    Serialize with `orjson`, or return None if the result would differ from
+    the standard library's.
+
+    `orjson` rejects integers wider than 64 bits, silently writes NaN and
+    infinities as `null`, and natively encodes types such as `datetime`,
+    `uuid.UUID` and dataclasses that `json` rejects.
+    """
+    try:
+        payload = orjson.dumps(
+            data, default=_orjson_default, option=option | _ORJSON_PASSTHROUGH
+        )
+    except orjson.JSONEncodeError:
+        return None
+    # NaN and infinities can only hide behind a `null` and UUIDs behind a
+    # UUID-shaped string, so the (slower) scan is skipped for the common
+    # payload that has neither.
+    if (b"null" in payload or _UUID_RE.search(payload)) and _needs_stdlib(data):
+        return None
+    return payload
+
+
+def _dumps(data: Any, pretty: bool = False) -> bytes:
+    """
+    Serialize data to UTF-8 encoded JSON.
+
+    Output is compact unless `pretty` is set, in which case it is indented by
+    two spaces. Uses `orjson` when available and falls back to the standard
+    library for anything `orjson` cannot encode the same way.
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        payload = _orjson_dumps(data, option)
+        if payload is not None:
+            return payload
+    if pretty:
+        return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _iter_dumps(data: dict, pretty: bool = False) -> Iterator[bytes]:
+    """
+    Serialize a dictionary one top-level entry at a time.
+
+    Produces exactly the same bytes as `_dumps(data, pretty)` for a non-empty
+    dictionary, but only a single entry is encoded in memory at any time.
+    """
+    # Strip the braces (and, when pretty, the newline before the closing one)
+    # from each single-entry encoding.
+    end = -2 if pretty else -1
+    yield b"{"
+    separator = b""
+    for key, value in data.items():
+        # Encoding a one-entry dict keeps key coercion and indentation
+        # identical to the one-shot encoder.
+        yield separator + _dumps({key: value}, pretty)[1:end]
+        separator = b","
+    yield b"\n}" if pretty else b"}"
+
+
+def _dumps_line(record: Any) -> bytes:
+    """
+    Serialize a journal record to a single newline-terminated JSON line.
+    """
+    if orjson is not None:
+        payload = _orjson_dumps(
+            record, orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE
+        )
+        if payload is not None:
+            return payload
+    return (
+        json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+    ).encode("utf-8")
+
+
+def _loads(payload: bytes) -> Any:
+    """
+    Deserialize UTF-8 encoded JSON.
+
+    Input that `orjson` rejects but the standard library accepts, such as
+    `NaN`, `Infinity` or integers wider than 64 bits, is decoded with `json`.
+    Raises `json.JSONDecodeError` on invalid input with either backend.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(payload)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(payload)
+
+
+def _validate_schema(schema: dict) -> None:
+    """
+    Check that a schema maps string keys to types.
+
+    Raises
+    ------
+    TypeError
+        If a key is not a string or a value is not a type.
+    """
+    for key, value_type in schema.items():
+        if not isinstance(key, str):
+            raise TypeError(f"Schema keys must be strings, got {key!r}")
+        if not isinstance(value_type, type):
+            raise TypeError(f"Schema values must be types, got {value_type!r} for {key!r}")
+
+
+def _compile_schema_encoder(schema: dict) -> Callable[[dict], bytes]:
+    """
+    Generate a compact JSON encoder specialized for a fixed set of keys.
+
+    The generated function inlines every key as a pre-encoded literal and
+    emits ints, bools, None and (with the standard library encoder) strings
+    without calling the general encoder, so the common case of a dictionary
+    holding exactly the schema keys is encoded without iterating over it.
+    Any other dictionary, or a value whose type does not match the schema,
+    falls back to `_dumps`.
+
+    Parameters
+    ----------
+    schema : dict
+        Maps each expected key to the type of its value, as checked by
+        `_validate_schema`.
+
+    Returns
+    -------
+    Callable[[dict], bytes]
+        Encoder producing the same JSON as `_dumps`, with the schema keys in
+        schema order.
+    """
+    if not schema:
+        return _dumps
+
+    loads = []
+    parts = []
+    for index, (key, value_type) in enumerate(schema.items()):
+        var = f"v{index}"
+        loads.append(f"        {var} = data[{key!r}]")
+        prefix = (b"{" if index == 0 else b",") + _dumps(key) + b":"
+        if value_type is int:
+            value = f"(str({var}).encode() if type({var}) is int else _dumps({var}))"
+        elif value_type is bool:
+            value = (
+                f'(b"true" if {var} is True else b"false" if {var} is False '
+                f"else _dumps({var}))"
+            )
+        elif value_type is type(None):
+            value = f'(b"null" if {var} is None else _dumps({var}))'
+        elif value_type is str and orjson is None:
+            # Same C routine the standard library encoder uses for strings.
+            value = (
+                f'(_quote({var}).encode("utf-8") if type({var}) is str '
+                f"else _dumps({var}))"
+            )
+        else:
+            value = f"_dumps({var})"
+        parts.append(f"        {prefix!r}, {value},")
+
+    source = "\n".join(
+        [
+            "def _encode(data):",
+            f"    if len(data) != {len(schema)}:",
+            "        return _dumps(data)",
+            "    try:",
+            *loads,
+            "    except KeyError:",
+            "        return _dumps(data)",
+            "    return b''.join((",
+            *parts,
+            "        b'}',",
+            "    ))",
+        ]
+    )
+    namespace = {"_dumps": _dumps, "_quote": json.encoder.encode_basestring}
+    exec(compile(source, "<schema encoder>", "exec"), namespace)
+    return namespace["_encode"]
+
+
+def _binary_codec(backend: str, pretty: bool = False) -> tuple:
+    """
+    Return the encoder, decoder and decode errors of a snapshot format.
+
+    Parameters
+    ----------
+    backend : str
+        One of "json", "msgpack" or "pickle".
+    pretty : bool, optional
+        Indent JSON output. Ignored by the binary formats.
+
+    Raises
+    ------
+    ValueError
+        If the backend is unknown.
+    ImportError
+        If the backend requires a package that is not installed.
+    """
+    if backend == "json":
+        return (
+            lambda data: _dumps(data, pretty),
+            _loads,
+            (json.JSONDecodeError,),
+        )
+    if backend == "msgpack":
+        if msgpack is None:
+            raise ImportError("The msgpack backend requires the 'msgpack' package.")
+        return (
+            lambda data: msgpack.packb(data, use_bin_type=True),
+            lambda payload: msgpack.unpackb(
+                payload, raw=False, strict_map_key=False
+            ),
+            (ValueError,),
+        )
+    if backend == "pickle":
+        return (
+            lambda data: pickle.dumps(data, protocol=5),
+            pickle.loads,
+            # A corrupted pickle can fail while importing or constructing the
+            # objects it names, with almost any exception type.
+            (Exception,),
+        )
+    raise ValueError(f"Unknown binary backend: {backend!r}")
+
+
+def _digest(payload: bytes) -> bytes:
+    """
+    Return a compact fingerprint of a serialized payload.
+
+    Must match the incremental digest computed while streaming a snapshot.
+    """
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+def _fsync(fd: int) -> None:
+    """
+    Flush a file descriptor all the way to stable storage.
+
+    On macOS `fsync` only reaches the drive cache, so `F_FULLFSYNC` is used.
+    """
+    if sys.platform == "darwin":
+        import fcntl
+
+        fcntl.fcntl(fd, fcntl.F_FULLFSYNC)
+    else:
+        os.fsync(fd)
+
+
+def _fsync_directory(path: str) -> None:
+    """
+    Persist a directory entry so that a preceding rename survives a crash.
+
+    Directories cannot be opened for syncing on Windows, so this is a no-op there.
+    """
+    if os.name == "nt":
+        return
+    dir_fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+# Whether files can be opened and renamed relative to a directory descriptor.
+_DIR_FD_SUPPORTED = (
+    hasattr(os, "O_DIRECTORY")
+    and {os.open, os.rename, os.remove} <= os.supports_dir_fd
+)
+
+
+def _atomic_write(path: str, payload: bytes) -> None:
+    """
+    Replace the file at `path` with `payload` without exposing partial writes.
+    """
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.write(payload)
+        file.flush()
+        _fsync(file.fileno())
+    os.replace(temp_path, path)
+    _fsync_directory(os.path.dirname(os.path.abspath(path)))
+
+
+class _SyncJournalBackend:
+    """
+    Appends journal chunks with plain `write` and `fsync` system calls.
+    """
+
+    def append(self, fd: int, chunk: bytes) -> None:
+        """
+        Write `chunk` to `fd` and sync it to stable storage.
+        """
+        view = memoryview(chunk)
+        while view:
+            view = view[os.write(fd, view):]
+        _fsync(fd)
+
+    def close(self) -> None:
+        """Release backend resources."""
+
+
+class _LinuxUringBackend:
+    """
+    Appends journal chunks through io_uring.
+
+    The write and the fsync are queued as two linked submission entries, so a
+    whole batch of records costs a single `io_uring_enter` call. The fsync only
+    runs if the write succeeded.
+    """
+
+    def __init__(self) -> None:
+        self._ring = liburing.Ring()
+        self._cqe = liburing.Cqe()
+        liburing.io_uring_queue_init(8, self._ring)
+
+    def append(self, fd: int, chunk: bytes) -> None:
+        """
+        Write `chunk` to `fd` and sync it to stable storage.
+
+        `fd` must be opened with `O_APPEND`; the write offset is ignored.
+        """
+        sqe = liburing.io_uring_get_sqe(self._ring)
+        liburing.io_uring_prep_write(sqe, fd, chunk, 0)
+        liburing.io_uring_sqe_set_flags(sqe, liburing.IOSQE_IO_LINK)
+        sqe = liburing.io_uring_get_sqe(self._ring)
+        liburing.io_uring_prep_fsync(sqe, fd)
+
+        liburing.io_uring_submit_and_wait(self._ring, 2)
+        liburing.io_uring_wait_cqe_nr(self._ring, self._cqe, 2)
+        try:
+            # Failed completions raise OSError when their result is read. A
+            # short write cancels the linked fsync, so its result is only
+            # checked once the whole chunk was written.
+            written = self._cqe[0].res
+            if written == len(chunk):
+                self._cqe[1].res
+        finally:
+            liburing.io_uring_cq_advance(self._ring, 2)
+
+        if written < len(chunk):
+            # Write the remainder and sync it with plain system calls.
+            _SyncJournalBackend().append(fd, chunk[written:])
+
+    def close(self) -> None:
+        """Tear down the ring."""
+        liburing.io_uring_queue_exit(self._ring)
+
+
+def _journal_backend():
+    """
+    Return the fastest journal backend supported by the running system.
+
+    io_uring is used on Linux when the `liburing` bindings are installed and
+    the kernel permits it; otherwise plain system calls are used.
+    """
+    if liburing is not None and platform.system() == "Linux":
+        try:
+            return _LinuxUringBackend()
+        except OSError:
+            pass
+    return _SyncJournalBackend()
+
+
+class _RWLock:
+    """
+    Reader/writer lock that lets readers proceed concurrently.
+
+    Writers are exclusive and reentrant, and the thread holding the write lock
+    may also acquire the read lock. Waiting writers take priority over new
+    readers so that a steady stream of reads cannot starve them. Read
+    acquisitions are not reentrant.
+    """
+
+    # Lock bookkeeping is touched on every access, so avoid a per-instance
+    # __dict__ and keep attribute lookups to fixed slot offsets.
+    __slots__ = (
+        "_mutex",
+        "_cond",
+        "_readers",
+        "_writer",
+        "_writer_depth",
+        "_writers_waiting",
+        "read",
+        "write",
+    )
+
+    def __init__(self) -> None:
+        # The mutex is used directly on the fast paths; its C-level context
+        # manager is cheaper than going through `Condition.__enter__`.
+        self._mutex = threading.Lock()
+        self._cond = threading.Condition(self._mutex)
+        self._readers = 0
+        self._writer: Optional[int] = None
+        self._writer_depth = 0
+        self._writers_waiting = 0
+        self.read = _ReadGuard(self)
+        self.write = _WriteGuard(self)
+
+    def acquire_read(self) -> None:
+        """Block until shared access is granted."""
+        with self._mutex:
+            if self._writer is None and not self._writers_waiting:
+                self._readers += 1
+                return
+            if self._writer == threading.get_ident():
+                self._writer_depth += 1
+                return
+            while self._writer is not None or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self) -> None:
+        """Release shared access."""
+        with self._mutex:
+            # A writer is only admitted once all readers have left, so while
+            # one is active every read hold belongs to the writer itself.
+            if self._writer is not None:
+                self._writer_depth -= 1
+                return
+            self._readers -= 1
+            if not self._readers and self._writers_waiting:
+                self._cond.notify_all()
+
+    def acquire_write(self) -> None:
+        """Block until exclusive access is granted."""
+        me = threading.get_ident()
+        with self._mutex:
+            if self._writer is None and not self._readers:
+                self._writer = me
+                self._writer_depth = 1
+                return
+            if self._writer == me:
+                self._writer_depth += 1
+                return
+            self._writers_waiting += 1
+            while self._writer is not None or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = me
+            self._writer_depth = 1
+
+    def release_write(self) -> None:
+        """Release exclusive access."""
+        with self._mutex:
+            self._writer_depth -= 1
+            if not self._writer_depth:
+                self._writer = None
+                self._cond.notify_all()
+
+
+class _ReadGuard:
+    """Context manager acquiring the shared side of an `_RWLock`."""
+
+    __slots__ = ("_lock",)
+
+    def __init__(self, lock: _RWLock) -> None:
+        self._lock = lock
+
+    def __enter__(self) -> None:
+        self._lock.acquire_read()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._lock.release_read()
+
+
+class _WriteGuard:
+    """Context manager acquiring the exclusive side of an `_RWLock`."""
+
+    __slots__ = ("_lock",)
+
+    def __init__(self, lock: _RWLock) -> None:
+        self._lock = lock
+
+    def __enter__(self) -> None:
+        self._lock.acquire_write()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._lock.release_write()
 
 
 class JSONDatabaseManager:
     """
-    Thread-safe JSON database manager.
+    Thread-safe JSON database manager.
+
+    This class provides a simple key-value storage backed by a JSON file,
+    ensuring safe concurrent access using a reader/writer lock and atomic
+    writes. Reads run concurrently; mutations are exclusive.
+
+    `data` is copy-on-write once shared: after a reference to it has been
+    handed out (by `get_all`, a streamed save or a transaction), the next
+    mutation builds a new dictionary and rebinds the attribute, so that
+    reference stays an immutable snapshot. Otherwise it is changed in place.
+    """
+
+    # Databases with more top-level keys than this are streamed to disk entry
+    # by entry instead of being encoded into a single buffer first.
+    _stream_threshold = 256
+
+    def __init__(
+        self,
+        file_path: str,
+        flush_interval: Optional[float] = None,
+        journal: bool = False,
+        binary_backend: Literal["json", "msgpack", "pickle"] = "json",
+        pretty: bool = False,
+        drop_cache_after_write: bool = False,
+        schema: Optional[dict] = None,
+    ) -> None:
+        """
+        Initialize the JSON Database Manager.
+
+        Parameters
+        ----------
+        file_path : str
+            Path to the JSON file used for persistent storage.
+        flush_interval : float, optional
+            Debounce window in seconds. When set, mutations only mark the data
+            as dirty and a single write is performed once no further changes
+            arrive within the window. Pending changes are also written by
+            `flush()` and on interpreter shutdown. When None (the default),
+            every mutation is written to disk immediately.
+        journal : bool, optional
+            If True, mutations are appended to a write-ahead log next to the
+            JSON file (`<file_path>.log`) instead of rewriting the whole file.
+            The log is replayed on startup and folded back into the JSON file
+            by `compact()`, which also runs automatically once the log grows
+            larger than the JSON file. Records are always JSON, so the journal
+            can only be used with the "json" `binary_backend`.
+        binary_backend : {"json", "msgpack", "pickle"}, optional
+            Format of the snapshot stored at `file_path`. The binary formats
+            are faster to encode and decode and produce smaller files; use
+            `export_json()` to obtain a human-readable copy. "msgpack"
+            requires the `msgpack` package. Only use "pickle" with files you
+            trust, since loading a pickle can execute arbitrary code.
+        pretty : bool, optional
+            If True, the JSON file is indented for readability. This makes
+            every write slower and larger and is meant for debugging only; by
+            default the file is written in compact form.
+        drop_cache_after_write : bool, optional
+            If True, tell the kernel that the pages of a freshly written file
+            will not be read back (`POSIX_FADV_DONTNEED`), so that saving does
+            not push hotter data out of the page cache. Leave it off if the
+            file is re-read soon after writing. Ignored where
+            `posix_fadvise` is unavailable.
+        schema : dict, optional
+            Maps the keys the database is expected to hold to the types of
+            their values, e.g. `{"theme": str, "width": int}`. A JSON encoder
+            specialized for exactly these keys is generated and used for
+            writes; other keys are still accepted and encoded normally.
+            Schema keys are written in schema order. Only used for compact
+            JSON output, and only when `orjson` is not installed, since its
+            general encoder is already faster.
+
+        Raises
+        ------
+        ValueError
+            If `binary_backend` is unknown or combined with `journal`.
+        TypeError
+            If `schema` has a key that is not a string or a value that is not
+            a type.
+        """
+        if journal and binary_backend != "json":
+            raise ValueError("journal=True requires the 'json' binary backend")
+        self._backend = binary_backend
+        self._pretty = pretty
+        self._drop_cache = drop_cache_after_write and hasattr(os, "posix_fadvise")
+        self._encode, self._decode, self._decode_errors = _binary_codec(
+            binary_backend, pretty
+        )
+        # Encoder for whole snapshots; `_encode` stays general for values.
+        self._encode_data = self._encode
+        if schema is not None:
+            _validate_schema(schema)
+        # orjson's one-shot encoder outruns any Python-level specialization,
+        # so the generated encoder only replaces the standard library one.
+        if (
+            schema is not None
+            and orjson is None
+            and binary_backend == "json"
+            and not pretty
+        ):
+            self._encode_data = _compile_schema_encoder(schema)
+        self.file_path = Path(file_path)
+        self._path_str = os.fspath(self.file_path)
+        self._tmp_path_str = self._path_str + ".tmp"
+        self._log_path_str = self._path_str + ".log"
+        self._dir_path_str = os.fspath(self.file_path.parent)
+        self._tmp_name = self.file_path.name + ".tmp"
+        self._dir_fd: Optional[int] = None
+        self._lock = _RWLock()
+        # Serializes disk writes, which happen outside of `_lock`.
+        self._io_lock = threading.Lock()
+        # Snapshots are numbered so a slower writer never overwrites a newer
+        # snapshot that reached the disk first.
+        self._snapshot_seq = itertools.count(1)
+        self._written_seq = 0
+        self._flush_interval = flush_interval
+        self._dirty = False
+        self._flush_timer: Optional[threading.Timer] = None
+        self._in_txn = False
+        # Thread running the open transaction, if any.
+        self._txn_owner: Optional[int] = None
+        # Incremented on every mutation; keys the cached `get_all` view.
+        self._version = 0
+        self._view_cache: tuple = (-1, None)
+        # Set when a reference to `data` escapes the lock; the next mutation
+        # then copies it instead of changing it in place.
+        self._shared = False
+        # Hashes handed out by `get_with_hash`, dropped when their key is
+        # written, so that in-place changes to a value that was read do not
+        # make its own conditional write look stale.
+        self._key_hashes: dict = {}
+        self._journal = journal
+        # Journal records queued under `_lock`, in mutation order.
+        self._pending_records: list = []
+        self._journal_size = 0
+        # Set when a failed append could not be undone; the next flush then
+        # compacts instead of appending after the torn record.
+        self._journal_torn = False
+        self._ensure_directory_exists()
+        if _DIR_FD_SUPPORTED:
+            # Resolve the directory once; writes then use paths relative to it.
+            self._dir_fd = os.open(
+                self._dir_path_str, os.O_RDONLY | os.O_DIRECTORY
+            )
+
+        self.data = self._load_base()
+        self._init_disk_state()
+
+        # Fold any leftover journal into the JSON file so that appends never
+        # follow a torn record and a non-journaled instance is not shadowed
+        # by stale operations.
+        if os.path.exists(self._log_path_str):
+            self._replay_journal(self.data)
+            self._save_data()
+            os.remove(self._log_path_str)
+        self._log = open(self._log_path_str, "ab", buffering=0) if journal else None
+        self._journal_backend = _journal_backend() if journal else None
+
+        # Whether `flush` is registered to run at interpreter exit, which
+        # keeps the instance alive until then.
+        self._flush_at_exit = flush_interval is not None
+        if self._flush_at_exit:
+            atexit.register(self.flush)
+
+    def _ensure_directory_exists(self) -> None:
+        """
+        Ensure that the parent directory of the database file exists.
+
+        Creates the directory tree if it does not already exist.
+        """
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+
+    def _init_disk_state(self) -> None:
+        """
+        Record what the freshly loaded JSON file contains.
+        """
+        payload = self._encode_data(self.data)
+        self._base_size = len(payload)
+        # Fingerprint of the last payload known to be on disk; writes of an
+        # identical payload are skipped.
+        self._last_digest: Optional[bytes] = _digest(payload) if self.data else None
+
+    def load_data(self) -> dict:
+        """
+        Load data from the JSON file, replaying any journaled operations.
+
+        Returns
+        -------
+        dict
+            The parsed JSON data, or an empty dictionary if the file does not exist
+            or contains invalid JSON.
+        """
+        data = self._load_base()
+        self._replay_journal(data)
+        return data
+
+    def _load_base(self) -> dict:
+        """
+        Load the JSON file without applying the journal.
+
+        Returns
+        -------
+        dict
+            The parsed JSON data, or an empty dictionary if the file does not exist,
+            cannot be decoded or does not hold an object.
+        """
+        try:
+            with open(self.file_path, "rb") as file:
+                data = self._decode(file.read())
+        except FileNotFoundError:
+            return {}
+        except self._decode_errors:
+            return self._invalid_file()
+        if not isinstance(data, dict):
+            return self._invalid_file()
+        return data
+
+    def _invalid_file(self) -> dict:
+        """
+        Warn that the file could not be decoded and return empty data.
+        """
+        print(
+            f"Warning: Invalid {self._backend.upper()} file at {self.file_path}. "
+            "Starting with empty data."
+        )
+        return {}
+
+    def _replay_journal(self, data: dict) -> int:
+        """
+        Apply the operations recorded in the journal to `data` in place.
+
+        Replay stops at the first record that cannot be decoded, which can only
+        be a partially written final record.
+
+        Parameters
+        ----------
+        data : dict
+            Data loaded from the JSON file.
+
+        Returns
+        -------
+        int
+            Number of operations applied.
+        """
+        try:
+            with open(self._log_path_str, "rb") as file:
+                lines = file.read().splitlines()
+        except FileNotFoundError:
+            return 0
+
+        applied = 0
+        for line in lines:
+            try:
+                record = _loads(line)
+            except json.JSONDecodeError:
+                break
+            op = record["op"]
+            if op == "set":
+                data[record["k"]] = record["v"]
+            elif op == "delete":
+                data.pop(record["k"], None)
+            elif op == "update":
+                data.update(record["v"])
+            elif op == "clear":
+                data.clear()
+            applied += 1
+        return applied
+
+    def _save_data(self) -> None:
+        """
+        Persist the in-memory data to disk using an atomic write strategy.
+
+        The data is serialized under the lock, which is then released before
+        any disk I/O so that readers and writers are not blocked by it.
+
+        Raises
+        ------
+        IOError
+            If an error occurs while writing the file.
+        """
+        with self._lock.read:
+            payload = self._snapshot_locked()
+            seq = next(self._snapshot_seq)
+        self._write_payload(payload, seq)
+
+    def _snapshot_locked(self) -> Union[bytes, dict]:
+        """
+        Capture the data for writing; the caller must hold the lock.
+
+        Returns
+        -------
+        bytes or dict
+            The serialized data, or for large databases the current snapshot,
+            to be streamed to disk once the lock has been released.
+        """
+        if self._backend == "json" and len(self.data) > self._stream_threshold:
+            self._shared = True
+            return self.data
+        return self._encode_data(self.data)
+
+    def _writable_data_locked(self) -> dict:
+        """
+        Return `data` for in-place mutation, copying it first if it is shared.
+
+        The caller must hold the write lock.
+        """
+        if self._shared:
+            self.data = dict(self.data)
+            self._shared = False
+        return self.data
+
+    def _write_payload(self, payload: Union[bytes, dict], seq: int) -> None:
+        """
+        Atomically write a snapshot to disk.
+
+        Parameters
+        ----------
+        payload : bytes or dict
+            Serialized database contents, or a snapshot to serialize while
+            streaming it to disk.
+        seq : int
+            Sequence number of the snapshot the payload was taken from.
+
+        Raises
+        ------
+        IOError
+            If an error occurs while writing the file.
+        """
+        with self._io_lock:
+            self._write_payload_locked(payload, seq)
+
+    def _write_payload_locked(self, payload: Union[bytes, dict], seq: int) -> None:
+        """
+        Body of `_write_payload`; the caller must hold `_io_lock`.
+
+        Writes to a temporary file first, syncs it to disk and then replaces
+        the original file, syncing the parent directory afterwards so that a
+        crash cannot leave behind an empty or truncated file. The write is
+        skipped entirely when the payload matches the last one persisted, or
+        when a newer snapshot has already been written.
+        """
+        if seq <= self._written_seq:
+            return
+        try:
+            if isinstance(payload, dict):
+                digest, size = self._stream_to_temp(payload)
+                if digest == self._last_digest:
+                    self._remove_temp()
+                    self._written_seq = seq
+                    return
+            else:
+                digest, size = _digest(payload), len(payload)
+                if digest == self._last_digest:
+                    self._written_seq = seq
+                    return
+
+                # Write to a temporary file first for safety
+                with open(self._open_temp(), "wb") as file:
+                    file.write(payload)
+                    file.flush()
+                    _fsync(file.fileno())
+                    self._drop_page_cache(file.fileno())
+
+            self._replace_with_temp()
+            self._last_digest = digest
+            self._base_size = size
+            self._written_seq = seq
+        except IOError as e:
+            raise IOError(f"Failed to save data to {self.file_path}: {e}")
+
+    def _stream_to_temp(self, data: dict) -> tuple:
+        """
+        Serialize `data` straight into the temporary file and sync it.
+
+        Returns
+        -------
+        tuple
+            The digest of the written bytes and their total size.
+        """
+        hasher = hashlib.blake2b(digest_size=16)
+        size = 0
+        try:
+            with open(self._open_temp(), "wb", buffering=1 << 16) as file:
+                for chunk in _iter_dumps(data, self._pretty):
+                    hasher.update(chunk)
+                    size += len(chunk)
+                    file.write(chunk)
+                file.flush()
+                _fsync(file.fileno())
+                self._drop_page_cache(file.fileno())
+        except BaseException:
+            # Unlike a one-shot write, encoding can fail after the file exists.
+            with contextlib.suppress(OSError):
+                self._remove_temp()
+            raise
+        return hasher.digest(), size
+
+    def _drop_page_cache(self, fd: int) -> None:
+        """
+        Hint the kernel to evict a synced file from the page cache, if enabled.
+        """
+        if self._drop_cache:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+
+    def _open_temp(self) -> int:
+        """
+        Create or truncate the temporary file and return its descriptor.
+        """
+        flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+        if self._dir_fd is not None:
+            return os.open(self._tmp_name, flags, 0o666, dir_fd=self._dir_fd)
+        return os.open(self._tmp_path_str, flags, 0o666)
+
+    def _replace_with_temp(self) -> None:
+        """
+        Atomically move the temporary file over the database file and make
+        the rename durable by syncing the directory.
+        """
+        if self._dir_fd is not None:
+            os.rename(
+                self._tmp_name,
+                self.file_path.name,
+                src_dir_fd=self._dir_fd,
+                dst_dir_fd=self._dir_fd,
+            )
+            os.fsync(self._dir_fd)
+        else:
+            os.replace(self._tmp_path_str, self._path_str)
+            _fsync_directory(self._dir_path_str)
+
+    def _remove_temp(self) -> None:
+        """
+        Delete the temporary file.
+        """
+        if self._dir_fd is not None:
+            os.remove(self._tmp_name, dir_fd=self._dir_fd)
+        else:
+            os.remove(self._tmp_path_str)
+
+    def _journal_line(self, record: dict) -> Optional[bytes]:
+        """
+        Encode a journal record, or return None when journaling is off.
+
+        Called before the mutation is applied, so that a value that cannot be
+        encoded leaves the data untouched.
+        """
+        if self._journal:
+            return _dumps_line(record)
+        return None
+
+    def _record(self, line: Optional[bytes]) -> None:
+        """
+        Queue a journal record for the mutation just applied.
+
+        Must be called while holding the write lock, so that records are
+        queued in the same order as the mutations they describe.
+        """
+        if line is not None:
+            self._pending_records.append(line)
+
+    def _flush_journal(self) -> None:
+        """
+        Append all queued records to the journal with a single write and fsync.
+
+        Compacts the journal once it grows larger than the JSON file.
+
+        Raises
+        ------
+        IOError
+            If an error occurs while writing the journal.
+        """
+        with self._io_lock:
+            with self._lock.write:
+                records, self._pending_records = self._pending_records, []
+            if not records:
+                return
+
+            if self._journal_torn:
+                # The queued records are already part of the in-memory data.
+                self._compact_locked()
+                return
+
+            chunk = b"".join(records)
+            try:
+                self._journal_backend.append(self._log.fileno(), chunk)
+            except IOError as e:
+                # Cut off whatever part of the chunk reached the file, so that
+                # retrying does not append records after a torn one.
+                try:
+                    self._log.truncate(self._journal_size)
+                except OSError:
+                    self._journal_torn = True
+                with self._lock.write:
+                    self._pending_records[:0] = records
+                raise IOError(f"Failed to append to {self._log_path_str}: {e}")
+            self._journal_size += len(chunk)
+
+            if self._journal_size > self._base_size:
+                self._compact_locked()
+
+    def compact(self) -> None:
+        """
+        Fold the journal into the JSON file and truncate it.
+
+        Without a journal this simply writes the current data to disk.
+
+        Raises
+        ------
+        RuntimeError
+            If called inside a transaction.
+        """
+        self._check_outside_transaction("compact")
+        with self._io_lock:
+            self._compact_locked()
+
+    def _compact_locked(self) -> None:
+        """
+        Body of `compact`; the caller must hold `_io_lock`.
+        """
+        with self._lock.write:
+            payload = self._snapshot_locked()
+            seq = next(self._snapshot_seq)
+            # The snapshot already contains every queued mutation.
+            self._pending_records = []
+        self._write_payload_locked(payload, seq)
+        if self._log is not None:
+            self._log.truncate(0)
+            self._journal_size = 0
+            self._journal_torn = False
+
+    def _persist(self) -> None:
+        """
+        Write pending changes to the journal or the JSON file.
+        """
+        if self._journal:
+            self._flush_journal()
+        else:
+            self._save_data()
+
+    def _schedule_flush(self) -> None:
+        """
+        Mark the data as dirty and (re)arm the debounced flush timer.
+
+        Falls back to an immediate write when no flush interval is configured.
+        Must be called without holding the lock.
+        """
+        if self._flush_interval is None:
+            self._persist()
+            return
+
+        with self._lock.write:
+            self._dirty = True
+            if not self._flush_at_exit:
+                # Written to again after `close()`.
+                self._flush_at_exit = True
+                atexit.register(self.flush)
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+            self._flush_timer = threading.Timer(
+                self._flush_interval, self._flush_if_dirty
+            )
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def _flush_if_dirty(self) -> None:
+        """
+        Write the data to disk if there are pending changes.
+        """
+        with self._lock.write:
+            if not self._dirty:
+                return
+            self._dirty = False
+        try:
+            self._persist()
+        except Exception:
+            with self._lock.write:
+                self._dirty = True
+            raise
+
+    def _check_outside_transaction(self, operation: str) -> None:
+        """
+        Refuse disk operations from inside this thread's transaction.
+
+        They would persist changes that may still be rolled back, and take
+        `_io_lock` while holding the write lock, the reverse of the order used
+        by journal flushes.
+
+        Raises
+        ------
+        RuntimeError
+            If the calling thread has a transaction open.
+        """
+        if self._txn_owner == threading.get_ident():
+            raise RuntimeError(f"{operation}() cannot be called inside a transaction.")
+
+    def flush(self) -> None:
+        """
+        Immediately persist any pending changes and cancel the flush timer.
+
+        Raises
+        ------
+        RuntimeError
+            If called inside a transaction.
+        """
+        self._check_outside_transaction("flush")
+        with self._lock.write:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+        self._flush_if_dirty()
+
+    def close(self) -> None:
+        """
+        Persist pending changes and release the journal and directory handles.
+
+        The journal is compacted first, so later writes go straight to the
+        JSON file. The flush registered to run at interpreter exit is
+        removed, so the instance can be garbage collected.
+
+        Raises
+        ------
+        RuntimeError
+            If called inside a transaction.
+        """
+        self._check_outside_transaction("close")
+        self.flush()
+        with self._lock.write:
+            if self._flush_at_exit:
+                self._flush_at_exit = False
+                atexit.unregister(self.flush)
+        with self._io_lock:
+            if self._dir_fd is not None:
+                os.close(self._dir_fd)
+                self._dir_fd = None
+            if self._log is not None:
+                self._compact_locked()
+                self._log.close()
+                self._log = None
+                self._journal_backend.close()
+                self._journal_backend = None
+                self._journal = False
+
+    def __del__(self) -> None:
+        """Release the directory handle if `close()` was not called."""
+        dir_fd = getattr(self, "_dir_fd", None)
+        if dir_fd is not None:
+            os.close(dir_fd)
+
+    @contextlib.contextmanager
+    def transaction(self) -> Iterator["JSONDatabaseManager"]:
+        """
+        Group several mutations into a single write.
+
+        The write lock is held for the whole block, so other threads observe
+        either none or all of its changes. Mutations inside the block are
+        only persisted, once, when the outermost transaction exits. If the
+        block raises, the data is rolled back to its state at the start of
+        the transaction and nothing is written. `flush()`, `compact()` and
+        `close()` cannot be called inside the block.
+
+        Yields
+        ------
+        JSONDatabaseManager
+            This database.
+
+        Examples
+        --------
+        >>> with db.transaction():
+        ...     db.set("theme", "dark")
+        ...     db.set("language", "en-us")
+        """
+        with self._lock.write:
+            if self._in_txn:
+                # Nested transactions are part of the outermost one.
+                yield self
+                return
+
+            snapshot = self.data
+            shared = self._shared
+            # The snapshot must survive the block for a rollback.
+            self._shared = True
+            hashes = dict(self._key_hashes)
+            queued = len(self._pending_records)
+            self._in_txn = True
+            self._txn_owner = threading.get_ident()
+            try:
+                yield self
+            except BaseException:
+                self.data = snapshot
+                self._shared = shared
+                self._key_hashes = hashes
+                self._version += 1
+                del self._pending_records[queued:]
+                raise
+            finally:
+                self._in_txn = False
+                self._txn_owner = None
+        self._schedule_flush()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Retrieve a value from the database.
+
+        Parameters
+        ----------
+        key : str
+            Key to retrieve.
+        default : Any, optional
+            Default value returned if the key does not exist.
+
+        Returns
+        -------
+        Any
+            The stored value associated with the key, or `default` if the key is not found.
+        """
+        with self._lock.read:
+            return self.data.get(key, default)
+
+    def _value_hash(self, value: Any) -> Optional[str]:
+        """
+        Return the content hash of a stored value, or None for a missing key.
+        """
+        if value is _UNCHECKED:
+            return None
+        return hashlib.blake2b(self._encode(value), digest_size=16).hexdigest()
+
+    def _key_hash_locked(self, key: str, value: Any) -> Optional[str]:
+        """
+        Return the hash of `value`, the current value of `key`, caching it per key.
+
+        The caller must hold the write lock.
+        """
+        digest = self._key_hashes.get(key)
+        if digest is None:
+            digest = self._value_hash(value)
+            if digest is not None:
+                self._key_hashes[key] = digest
+        return digest
+
+    def _check_hash_locked(self, key: str, expected_hash: Any) -> None:
+        """
+        Enforce an `expected_hash` precondition; the caller must hold the write lock.
+
+        Raises
+        ------
+        StalePrecondition
+            If the current value of `key` does not hash to `expected_hash`.
+        """
+        if expected_hash is _UNCHECKED:
+            return
+        if self._key_hash_locked(key, self.data.get(key, _UNCHECKED)) != expected_hash:
+            raise StalePrecondition(f"Value of {key!r} changed since it was read.")
+
+    def get_with_hash(self, key: str, default: Any = None) -> tuple:
+        """
+        Retrieve a value together with its content hash.
+
+        The hash can be passed back as `expected_hash` to make a later write
+        conditional on the value not having changed in between.
+
+        Parameters
+        ----------
+        key : str
+            Key to retrieve.
+        default : Any, optional
+            Default value returned if the key does not exist.
+
+        Returns
+        -------
+        tuple
+            The value (or `default`) and its hash, which is None if the key
+            does not exist.
+        """
+        with self._lock.write:
+            value = self.get(key, _UNCHECKED)
+            if value is _UNCHECKED:
+                return default, None
+            return value, self._key_hash_locked(key, value)
+
+    def cas(self, key: str, new_value: Any, expected_hash: Optional[str]) -> bool:
+        """
+        Store a value only if the current one still has the expected hash.
+
+        Parameters
+        ----------
+        key : str
+            Key to set.
+        new_value : Any
+            Value to store.
+        expected_hash : str or None
+            Hash obtained from `get_with_hash`; None requires the key to be absent.
+
+        Returns
+        -------
+        bool
+            True if the value was stored, False if it had changed.
+        """
+        try:
+            self.set(key, new_value, expected_hash=expected_hash)
+        except StalePrecondition:
+            return False
+        return True
+
+    def set(
+        self, key: str, value: Any, sync: bool = False, expected_hash: Any = _UNCHECKED
+    ) -> None:
+        """
+        Store a value in the database and persist it to disk.
+
+        Parameters
+        ----------
+        key : str
+            Key to set.
+        value : Any
+            Value to store.
+        sync : bool, optional
+            If True, write to disk immediately even when writes are debounced.
+        expected_hash : str or None, optional
+            If given, only write when the current value has this hash (see
+            `get_with_hash`); None requires the key to be absent.
+
+        Raises
+        ------
+        StalePrecondition
+            If `expected_hash` does not match the current value.
+        """
+        with self._lock.write:
+            self._check_hash_locked(key, expected_hash)
+            line = self._journal_line({"op": "set", "k": key, "v": value})
+            self._writable_data_locked()[key] = value
+            self._version += 1
+            self._key_hashes.pop(key, None)
+            self._record(line)
+            deferred = self._in_txn
+        if not deferred:
+            self._schedule_flush()
+            if sync:
+                self.flush()
+
+    def delete(self, key: str, expected_hash: Any = _UNCHECKED) -> bool:
+        """
+        Delete a key from the database.
+
+        Parameters
+        ----------
+        key : str
+            Key to delete.
+        expected_hash : str or None, optional
+            If given, only delete when the current value has this hash.
+
+        Returns
+        -------
+        bool
+            True if the key existed and was deleted, False otherwise.
+
+        Raises
+        ------
+        StalePrecondition
+            If `expected_hash` does not match the current value.
+        """
+        with self._lock.write:
+            self._check_hash_locked(key, expected_hash)
+            if key not in self.data:
+                return False
+            line = self._journal_line({"op": "delete", "k": key})
+            del self._writable_data_locked()[key]
+            self._version += 1
+            self._key_hashes.pop(key, None)
+            self._record(line)
+            deferred = self._in_txn
+        if not deferred:
+            self._schedule_flush()
+        return True
+
+    def clear(self) -> None:
+        """
+        Remove all entries from the database and persist the change.
+        """
+        with self._lock.write:
+            line = self._journal_line({"op": "clear"})
+            self.data = {}
+            self._shared = False
+            self._version += 1
+            self._key_hashes = {}
+            self._record(line)
+            deferred = self._in_txn
+        if not deferred:
+            self._schedule_flush()
+
+    def exists(self, key: str) -> bool:
+        """
+        Check whether a key exists in the database.
+
+        Parameters
+        ----------
+        key : str
+            Key to check.
+
+        Returns
+        -------
+        bool
+            True if the key exists, False otherwise.
+        """
+        with self._lock.read:
+            return key in self.data
+
+    def update(
+        self, updates: dict, sync: bool = False, expected_hashes: Optional[dict] = None
+    ) -> None:
+        """
+        Update multiple key-value pairs at once and persist the changes.
+
+        Parameters
+        ----------
+        updates : dict
+            Dictionary containing key-value pairs to update.
+        sync : bool, optional
+            If True, write to disk immediately even when writes are debounced.
+        expected_hashes : dict, optional
+            Maps keys to the hash their current value must have (see
+            `get_with_hash`). Nothing is written unless every hash matches.
+
+        Raises
+        ------
+        StalePrecondition
+            If any of `expected_hashes` does not match the current value.
+        """
+        with self._lock.write:
+            for key, expected_hash in (expected_hashes or {}).items():
+                self._check_hash_locked(key, expected_hash)
+            line = self._journal_line({"op": "update", "v": updates})
+            self._writable_data_locked().update(updates)
+            self._version += 1
+            if self._key_hashes:
+                for key in updates:
+                    self._key_hashes.pop(key, None)
+            self._record(line)
+            deferred = self._in_txn
+        if not deferred:
+            self._schedule_flush()
+            if sync:
+                self.flush()
+
+    def get_all(self) -> MappingProxyType:
+        """
+        Return a read-only view of all stored data.
+
+        The view is a snapshot: it does not change when the database is
+        modified afterwards, and it is returned without copying.
+
+        Returns
+        -------
+        MappingProxyType
+            An immutable mapping of every stored key to its value.
+        """
+        with self._lock.read:
+            version, view = self._view_cache
+            if version != self._version:
+                view = MappingProxyType(self.data)
+                self._view_cache = (self._version, view)
+                self._shared = True
+            return view
+
+    def export_json(self, file_path: str) -> None:
+        """
+        Write a human-readable JSON copy of all stored data.
+
+        Parameters
+        ----------
+        file_path : str
+            Destination of the JSON export.
+
+        Raises
+        ------
+        IOError
+            If an error occurs while writing the file.
+        """
+        with self._lock.read:
+            payload = _dumps(self.data, pretty=True)
+        path = os.fspath(file_path)
+        try:
+            _atomic_write(path, payload)
+        except IOError as e:
+            raise IOError(f"Failed to export data to {path}: {e}")
+
+
+# Matches JSON strings and structural characters; scalars fall in between.
+_TOKEN_RE = re.compile(rb'"(?:[^"\\]|\\.)*"|[{}\[\]:,]')
+# JSON whitespace between tokens.
+_BLANK_RE = re.compile(rb"[ \t\n\r]*")
+
+
+def _check_value(start: Optional[int], filled: bool, offset: int) -> None:
+    """
+    Raise `json.JSONDecodeError` unless a top-level value was read before `offset`.
+    """
+    if start is None:
+        raise json.JSONDecodeError("Expected ':' after key", "", offset)
+    if not filled:
+        raise json.JSONDecodeError("Expected a value", "", offset)
 
-    This class provides a simple key-value storage backed by a JSON file,
-    ensuring safe concurrent access using reentrant locks and atomic writes.
+
+def _index_top_level(buffer: Any) -> dict:
+    """
+    Locate the value of every top-level key of a JSON object.
+
+    Only strings and structural characters are inspected, so nested values
+    are skipped without being decoded.
+
+    Parameters
+    ----------
+    buffer : bytes-like
+        The encoded JSON document.
+
+    Returns
+    -------
+    dict
+        Maps each key to the `(offset, length)` of its encoded value.
+
+    Raises
+    ------
+    json.JSONDecodeError
+        If the document is not a well-formed JSON object.
+    """
+    offsets = {}
+    depth = 0
+    key = None
+    # Offset where the current top-level value starts, once its ':' is seen.
+    start = None
+    # Whether the current top-level value has begun.
+    filled = False
+    # Whether a ',' still awaits the next key.
+    after_comma = False
+    closed = False
+    pos = 0
+    for match in _TOKEN_RE.finditer(buffer):
+        if depth <= 1 and not _BLANK_RE.fullmatch(buffer, pos, match.start()):
+            # Outside nested values, only a scalar value may sit between tokens.
+            if start is None or filled:
+                raise json.JSONDecodeError("Unexpected data", "", pos)
+            filled = True
+        pos = match.end()
+        token = match.group()
+        char = token[:1]
+        if depth == 0 and (closed or char != b"{"):
+            raise json.JSONDecodeError("Expected a single JSON object", "", match.start())
+        if depth == 1 and start is not None and char in b'"{[':
+            if filled:
+                raise json.JSONDecodeError("Expected ',' or '}'", "", match.start())
+            filled = True
+        if char == b'"':
+            if depth == 1 and start is None:
+                if key is not None:
+                    raise json.JSONDecodeError("Expected ':' after key", "", match.start())
+                key = _loads(token)
+                after_comma = False
+        elif char in b"{[":
+            depth += 1
+        elif char in b"}]":
+            if depth == 1:
+                if key is not None:
+                    _check_value(start, filled, match.start())
+                    offsets[key] = (start, match.start() - start)
+                    key = start = None
+                    filled = False
+                elif after_comma:
+                    raise json.JSONDecodeError("Expected a key after ','", "", match.start())
+            depth -= 1
+            closed = depth == 0
+        elif depth == 1:
+            if char == b":":
+                if key is None or start is not None:
+                    raise json.JSONDecodeError("Unexpected ':'", "", match.start())
+                start = pos
+            else:
+                _check_value(start, filled, match.start())
+                offsets[key] = (start, match.start() - start)
+                key = start = None
+                filled = False
+                after_comma = True
+    if not closed:
+        raise json.JSONDecodeError("Unterminated JSON object", "", len(buffer))
+    if not _BLANK_RE.fullmatch(buffer, pos):
+        raise json.JSONDecodeError("Extra data", "", pos)
+    return offsets
+
+
+class LazyJSONDatabaseManager(JSONDatabaseManager):
+    """
+    JSON database manager that decodes values only when they are read.
+
+    On startup the file is memory-mapped and scanned once to record where each
+    top-level value lives; `get` then decodes just the requested value. The
+    first mutation, or any call that needs the whole dictionary, loads the
+    full file and from then on the instance behaves like
+    `JSONDatabaseManager`.
+
+    Values are validated when they are decoded, so a corrupted value is only
+    reported when it is first accessed.
     """
 
-    def __init__(self, file_path: str) -> None:
+    def __init__(self, file_path: str, **kwargs: Any) -> None:
         """
-        Initialize the JSON Database Manager.
+        Initialize the lazy JSON Database Manager.
 
         Parameters
         ----------
         file_path : str
             Path to the JSON file used for persistent storage.
+        **kwargs
+            Forwarded to `JSONDatabaseManager`.
         """
-        self.file_path = Path(file_path)
-        self._lock = threading.RLock()
-        self._ensure_directory_exists()
-        self.data = self.load_data()
+        if kwargs.get("binary_backend", "json") != "json":
+            raise ValueError("LazyJSONDatabaseManager only supports JSON files.")
+        self._data: Optional[dict] = None
+        self._mmap: Optional[mmap.mmap] = None
+        self._offsets: dict = {}
+        self._values: dict = {}
+        self._materialize_lock = threading.Lock()
+        super().__init__(file_path, **kwargs)
 
-    def _ensure_directory_exists(self) -> None:
+    @property
+    def data(self) -> dict:
         """
-        Ensure that the parent directory of the database file exists.
-
-        Creates the directory tree if it does not already exist.
+        The full data dictionary, loaded from disk on first access.
         """
-        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        if self._data is None:
+            with self._materialize_lock:
+                if self._data is None:
+                    self._data = self._materialize()
+        return self._data
+
+    @data.setter
+    def data(self, value: Optional[dict]) -> None:
+        self._data = value
 
     def load_data(self) -> dict:
         """
-        Load data from the JSON file.
+        Load data from the JSON file, replaying any journaled operations.
+
+        The file is decoded in full; the lazy index of this instance is left
+        untouched.
 
         Returns
         -------
@@ -44,41 +1713,231 @@ class JSONDatabaseManager:
             The parsed JSON data, or an empty dictionary if the file does not exist
             or contains invalid JSON.
         """
+        data = super()._load_base()
+        self._replay_journal(data)
+        return data
+
+    def _load_base(self) -> Optional[dict]:
+        """
+        Map the JSON file into memory and index its top-level keys.
+
+        Returns
+        -------
+        dict or None
+            None when the file was indexed for lazy access, otherwise the data
+            to start with (empty if the file does not exist or is invalid).
+        """
         try:
-            with open(self.file_path, "r", encoding="utf-8") as file:
-                return json.load(file)
+            with open(self.file_path, "rb") as file:
+                buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
         except FileNotFoundError:
             return {}
+        except ValueError:
+            # Empty files cannot be mapped.
+            return super()._load_base()
+
+        try:
+            self._offsets = _index_top_level(buffer)
         except json.JSONDecodeError:
-            print(
-                f"Warning: Invalid JSON file at {self.file_path}. "
-                "Starting with empty data."
-            )
+            buffer.close()
+            return super()._load_base()
+        self._mmap = buffer
+        return None
+
+    def _init_disk_state(self) -> None:
+        """
+        Record what the freshly loaded JSON file contains.
+
+        While values are still lazy the file is not re-encoded, so the first
+        write always goes to disk.
+        """
+        if self._data is not None:
+            super()._init_disk_state()
+            return
+        self._base_size = len(self._mmap)
+        self._last_digest = None
+
+    def _materialize(self) -> dict:
+        """
+        Decode the whole mapped file, keeping values already handed out.
+        """
+        if self._mmap is None:
             return {}
+        try:
+            data = _loads(self._mmap[:])
+        except json.JSONDecodeError:
+            # The index only checks the structure; a scalar can still be bad.
+            data = self._invalid_file()
+        else:
+            data.update(self._values)
+        self._mmap.close()
+        self._mmap = None
+        self._offsets = {}
+        self._values = {}
+        return data
 
-    def _save_data(self) -> None:
+    def get(self, key: str, default: Any = None) -> Any:
         """
-        Persist the in-memory data to disk using an atomic write strategy.
+        Retrieve a value from the database, decoding it on first access.
+
+        Parameters
+        ----------
+        key : str
+            Key to retrieve.
+        default : Any, optional
+            Default value returned if the key does not exist.
+
+        Returns
+        -------
+        Any
+            The stored value associated with the key, or `default` if the key is not found.
+        """
+        with self._lock.read:
+            if self._data is not None:
+                return self._data.get(key, default)
+            # Another reader may be materializing the data and unmapping the
+            # file, so the lazy path runs under the same lock.
+            with self._materialize_lock:
+                if self._data is not None:
+                    return self._data.get(key, default)
+                if key in self._values:
+                    return self._values[key]
+                span = self._offsets.get(key)
+                if span is None:
+                    return default
+                offset, length = span
+                value = _loads(self._mmap[offset:offset + length])
+                self._values[key] = value
+                return value
+
+    def exists(self, key: str) -> bool:
+        """
+        Check whether a key exists in the database.
+
+        Parameters
+        ----------
+        key : str
+            Key to check.
+
+        Returns
+        -------
+        bool
+            True if the key exists, False otherwise.
+        """
+        with self._lock.read:
+            if self._data is not None:
+                return key in self._data
+            with self._materialize_lock:
+                if self._data is not None:
+                    return key in self._data
+                return key in self._offsets
 
-        Writes to a temporary file first and then replaces the original file
-        to reduce the risk of data corruption.
+
+class ShardedJSONDatabaseManager:
+    """
+    Thread-safe key-value storage split across several JSON files.
+
+    Keys are assigned to shards by a stable hash, and every shard is an
+    independent `JSONDatabaseManager` with its own file and lock. A write
+    therefore only rewrites the shard holding the key, and writes to keys in
+    different shards proceed in parallel.
+    """
+
+    def __init__(self, file_path: str, shards: int = 16, **kwargs: Any) -> None:
+        """
+        Initialize the sharded JSON Database Manager.
+
+        Parameters
+        ----------
+        file_path : str
+            Base path of the shard files; shard `i` of `settings.json` is
+            stored in `settings.000i.json`.
+        shards : int, optional
+            Number of shards. Changing it between runs is supported: keys are
+            moved to their new shard when the database is opened.
+        **kwargs
+            Forwarded to every shard's `JSONDatabaseManager`.
 
         Raises
         ------
-        IOError
-            If an error occurs while writing the file.
+        ValueError
+            If `shards` is less than 1.
         """
-        with self._lock:
-            try:
-                # Write to a temporary file first for safety
-                temp_path = self.file_path.with_suffix(".tmp")
-                with open(temp_path, "w", encoding="utf-8") as file:
-                    json.dump(self.data, file, indent=4, ensure_ascii=False)
+        if shards < 1:
+            raise ValueError("shards must be at least 1")
+        self.file_path = Path(file_path)
+        self._shard_count = shards
+        # Merged `get_all` view, keyed by the version of every shard.
+        self._merged_cache: tuple = ((), None)
+        self._shards = [
+            JSONDatabaseManager(os.fspath(self._shard_path(i)), **kwargs)
+            for i in range(shards)
+        ]
+        self._rebalance(kwargs.get("binary_backend", "json"))
 
-                # Atomically replace the original file
-                temp_path.replace(self.file_path)
-            except IOError as e:
-                raise IOError(f"Failed to save data to {self.file_path}: {e}")
+    def _shard_path(self, index: int) -> Path:
+        """
+        Return the file used by the shard at `index`.
+        """
+        return self.file_path.with_name(
+            f"{self.file_path.stem}.{index:04d}{self.file_path.suffix}"
+        )
+
+    def _shard_index(self, key: str) -> int:
+        """
+        Return the shard index of a key.
+
+        `hash()` is salted per process, so a CRC is used to keep the
+        assignment stable across runs.
+        """
+        return zlib.crc32(str(key).encode("utf-8")) % self._shard_count
+
+    def _shard_for(self, key: str) -> JSONDatabaseManager:
+        """
+        Return the shard responsible for a key.
+        """
+        return self._shards[self._shard_index(key)]
+
+    def _rebalance(self, binary_backend: str) -> None:
+        """
+        Move keys left behind by a different shard count to their shard.
+        """
+        pattern = re.compile(
+            re.escape(self.file_path.stem)
+            + r"\.(\d{4})"
+            + re.escape(self.file_path.suffix)
+            + "$"
+        )
+        moved: dict = {}
+        orphans = []
+        for path in self.file_path.parent.iterdir():
+            match = pattern.match(path.name)
+            if match and int(match.group(1)) >= self._shard_count:
+                orphan = JSONDatabaseManager(
+                    os.fspath(path), binary_backend=binary_backend
+                )
+                moved.update(orphan.get_all())
+                orphan.close()
+                orphans.append(path)
+
+        misplaced = []
+        for index, shard in enumerate(self._shards):
+            for key, value in shard.get_all().items():
+                if self._shard_index(key) != index:
+                    moved[key] = value
+                    misplaced.append((shard, key))
+
+        if moved:
+            # Only drop the old copies once the keys are on disk in their new
+            # shards, so a crash in between cannot lose them.
+            self.update(moved, sync=True)
+            self.flush()
+        for path in orphans:
+            os.remove(path)
+        for shard, key in misplaced:
+            shard.delete(key)
+        if misplaced:
+            self.flush()
 
     def get(self, key: str, default: Any = None) -> Any:
         """
@@ -96,12 +1955,52 @@ class JSONDatabaseManager:
         Any
             The stored value associated with the key, or `default` if the key is not found.
         """
-        with self._lock:
-            return self.data.get(key, default)
+        return self._shard_for(key).get(key, default)
 
-    def set(self, key: str, value: Any) -> None:
+    def get_with_hash(self, key: str, default: Any = None) -> tuple:
         """
-        Store a value in the database and persist it to disk.
+        Retrieve a value together with its content hash.
+
+        Parameters
+        ----------
+        key : str
+            Key to retrieve.
+        default : Any, optional
+            Default value returned if the key does not exist.
+
+        Returns
+        -------
+        tuple
+            The value (or `default`) and its hash, which is None if the key
+            does not exist.
+        """
+        return self._shard_for(key).get_with_hash(key, default)
+
+    def cas(self, key: str, new_value: Any, expected_hash: Optional[str]) -> bool:
+        """
+        Store a value only if the current one still has the expected hash.
+
+        Parameters
+        ----------
+        key : str
+            Key to set.
+        new_value : Any
+            Value to store.
+        expected_hash : str or None
+            Hash obtained from `get_with_hash`; None requires the key to be absent.
+
+        Returns
+        -------
+        bool
+            True if the value was stored, False if it had changed.
+        """
+        return self._shard_for(key).cas(key, new_value, expected_hash)
+
+    def set(
+        self, key: str, value: Any, sync: bool = False, expected_hash: Any = _UNCHECKED
+    ) -> None:
+        """
+        Store a value and persist the shard holding it.
 
         Parameters
         ----------
@@ -109,12 +2008,19 @@ class JSONDatabaseManager:
             Key to set.
         value : Any
             Value to store.
+        sync : bool, optional
+            If True, write to disk immediately even when writes are debounced.
+        expected_hash : str or None, optional
+            If given, only write when the current value has this hash.
+
+        Raises
+        ------
+        StalePrecondition
+            If `expected_hash` does not match the current value.
         """
-        with self._lock:
-            self.data[key] = value
-            self._save_data()
+        self._shard_for(key).set(key, value, sync=sync, expected_hash=expected_hash)
 
-    def delete(self, key: str) -> bool:
+    def delete(self, key: str, expected_hash: Any = _UNCHECKED) -> bool:
         """
         Delete a key from the database.
 
@@ -122,26 +2028,27 @@ class JSONDatabaseManager:
         ----------
         key : str
             Key to delete.
+        expected_hash : str or None, optional
+            If given, only delete when the current value has this hash.
 
         Returns
         -------
         bool
             True if the key existed and was deleted, False otherwise.
+
+        Raises
+        ------
+        StalePrecondition
+            If `expected_hash` does not match the current value.
         """
-        with self._lock:
-            if key in self.data:
-                del self.data[key]
-                self._save_data()
-                return True
-            return False
+        return self._shard_for(key).delete(key, expected_hash=expected_hash)
 
     def clear(self) -> None:
         """
-        Remove all entries from the database and persist the change.
+        Remove all entries from every shard and persist the change.
         """
-        with self._lock:
-            self.data.clear()
-            self._save_data()
+        for shard in self._shards:
+            shard.clear()
 
     def exists(self, key: str) -> bool:
         """
@@ -157,30 +2064,87 @@ class JSONDatabaseManager:
         bool
             True if the key exists, False otherwise.
         """
-        with self._lock:
-            return key in self.data
+        return self._shard_for(key).exists(key)
 
-    def update(self, updates: dict) -> None:
+    def update(self, updates: dict, sync: bool = False) -> None:
         """
-        Update multiple key-value pairs at once and persist the changes.
+        Update multiple key-value pairs, writing each affected shard once.
 
         Parameters
         ----------
         updates : dict
             Dictionary containing key-value pairs to update.
+        sync : bool, optional
+            If True, write to disk immediately even when writes are debounced.
         """
-        with self._lock:
-            self.data.update(updates)
-            self._save_data()
+        groups: dict = {}
+        for key, value in updates.items():
+            groups.setdefault(self._shard_index(key), {})[key] = value
+        for index, group in groups.items():
+            self._shards[index].update(group, sync=sync)
 
-    def get_all(self) -> dict:
+    def get_all(self) -> MappingProxyType:
         """
-        Return a shallow copy of all stored data.
+        Return a consistent read-only snapshot of the data in every shard.
 
         Returns
         -------
-        dict
-            A copy of the internal data dictionary.
+        MappingProxyType
+            An immutable mapping merging all shards.
+        """
+        locks = [shard._lock for shard in self._shards]
+        for lock in locks:
+            lock.acquire_read()
+        try:
+            versions = tuple(shard._version for shard in self._shards)
+            cached_versions, view = self._merged_cache
+            if cached_versions != versions:
+                merged: dict = {}
+                for shard in self._shards:
+                    merged.update(shard.data)
+                view = MappingProxyType(merged)
+                self._merged_cache = (versions, view)
+            return view
+        finally:
+            for lock in reversed(locks):
+                lock.release_read()
+
+    def flush(self) -> None:
+        """
+        Immediately persist pending changes in every shard.
+        """
+        for shard in self._shards:
+            shard.flush()
+
+    def compact(self) -> None:
+        """
+        Fold every shard's journal into its JSON file.
+        """
+        for shard in self._shards:
+            shard.compact()
+
+    def close(self) -> None:
+        """
+        Persist pending changes and release every shard's file handles.
+        """
+        for shard in self._shards:
+            shard.close()
+
+    @contextlib.contextmanager
+    def transaction(self) -> Iterator["ShardedJSONDatabaseManager"]:
+        """
+        Group several mutations across shards into one write per shard.
+
+        Every shard's transaction is entered in shard order, so the block
+        has exclusive access to the whole database. If the block raises,
+        every shard is rolled back.
+
+        Yields
+        ------
+        ShardedJSONDatabaseManager
+            This database.
         """
-        with self._lock:
-            return self.data.copy()
+        with contextlib.ExitStack() as stack:
+            for shard in self._shards:
+                stack.enter_context(shard.transaction())
+            yield self
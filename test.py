@@ -1,10 +1,32 @@
+import gc
+import json
+import math
+import os
 import shutil
+import sys
 import tempfile
 import threading
 import unittest
+import uuid
+import weakref
+from dataclasses import dataclass
+from datetime import datetime
 from pathlib import Path
+from unittest import mock
 
-from json_database_manager import JSONDatabaseManager  # ajuste o import para o nome do seu arquivo
+import json_database_manager
+from json_database_manager import (  # ajuste o import para o nome do seu arquivo
+    JSONDatabaseManager,
+    LazyJSONDatabaseManager,
+    ShardedJSONDatabaseManager,
+    StalePrecondition,
+)
+
+
+@dataclass
+class Point:
+    x: int
+    y: int
 
 
 class TestJSONDatabaseManager(unittest.TestCase):
@@ -44,6 +66,38 @@ class TestJSONDatabaseManager(unittest.TestCase):
         self.assertTrue(result)
         self.assertFalse(self.db.exists("key"))
 
+    def test_get_all_returns_read_only_snapshot(self):
+        """get_all should return an immutable view unaffected by later writes."""
+        self.db.set("theme", "dark")
+        snapshot = self.db.get_all()
+        self.db.set("theme", "light")
+
+        self.assertEqual(snapshot, {"theme": "dark"})
+        with self.assertRaises(TypeError):
+            snapshot["theme"] = "blue"
+
+    def test_get_all_reuses_view_until_modified(self):
+        """Repeated get_all calls should share a view until data changes."""
+        self.db.set("theme", "dark")
+        self.assertIs(self.db.get_all(), self.db.get_all())
+
+        before = self.db.get_all()
+        self.db.set("theme", "light")
+        self.assertIsNot(self.db.get_all(), before)
+        self.assertEqual(self.db.get_all(), {"theme": "light"})
+
+    def test_unshared_data_is_mutated_in_place(self):
+        """Data should only be copied once a reference to it was handed out."""
+        self.db.set("theme", "dark")
+        data = self.db.data
+        self.db.set("language", "en")
+        self.assertIs(self.db.data, data)
+
+        snapshot = self.db.get_all()
+        self.db.delete("theme")
+        self.assertIsNot(self.db.data, data)
+        self.assertEqual(snapshot, {"theme": "dark", "language": "en"})
+
     def test_delete_missing_key(self):
         """Should return False when deleting non-existing key."""
         result = self.db.delete("missing")
@@ -72,6 +126,292 @@ class TestJSONDatabaseManager(unittest.TestCase):
         self.assertEqual(new_db.get("theme"), "dark")
         self.assertEqual(new_db.get("volume"), 80)
 
+    def test_unchanged_data_is_not_rewritten(self):
+        """Setting the same value twice should not rewrite the file."""
+        self.db.set("theme", "dark")
+        self.db_path.write_text('{"theme": "tampered"}', encoding="utf-8")
+
+        self.db.set("theme", "dark")
+        self.assertEqual(
+            self.db_path.read_text(encoding="utf-8"), '{"theme": "tampered"}'
+        )
+
+    def test_transaction_writes_once_on_exit(self):
+        """Mutations in a transaction should reach disk together at the end."""
+        with self.db.transaction():
+            self.db.set("theme", "dark")
+            recent = self.db.get("recent_files", [])
+            self.db.set("recent_files", recent + ["a.txt"])
+            self.db.delete("theme")
+            self.assertFalse(self.db_path.exists())
+
+        new_db = JSONDatabaseManager(str(self.db_path))
+        self.assertEqual(new_db.get_all(), {"recent_files": ["a.txt"]})
+
+    def test_transaction_rolls_back_on_error(self):
+        """A failing transaction should leave the data untouched."""
+        self.db.set("theme", "dark")
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                self.db.set("theme", "light")
+                self.db.clear()
+                raise RuntimeError("abort")
+
+        self.assertEqual(self.db.get_all(), {"theme": "dark"})
+        new_db = JSONDatabaseManager(str(self.db_path))
+        self.assertEqual(new_db.get_all(), {"theme": "dark"})
+
+    def test_journaled_transaction_rollback(self):
+        """Rolled-back journal records should never reach the log."""
+        db = JSONDatabaseManager(str(self.db_path), journal=True)
+        db.set("a", 1)
+        with self.assertRaises(RuntimeError):
+            with db.transaction():
+                db.set("a", 2)
+                raise RuntimeError("abort")
+        with db.transaction():
+            db.set("b", 3)
+
+        new_db = JSONDatabaseManager(str(self.db_path), journal=True)
+        self.assertEqual(new_db.get_all(), {"a": 1, "b": 3})
+
+    def test_disk_operations_rejected_inside_transaction(self):
+        """Flushing inside a transaction could persist rolled-back changes."""
+        db = JSONDatabaseManager(str(self.db_path), journal=True)
+        db.set("a", 1)
+
+        with db.transaction():
+            db.set("a", 2)
+            for operation in (db.flush, db.compact, db.close):
+                with self.assertRaises(RuntimeError):
+                    operation()
+        db.compact()
+
+        self.assertEqual(JSONDatabaseManager(str(self.db_path)).get("a"), 2)
+
+    def test_sharded_transaction(self):
+        """A sharded transaction should commit or roll back every shard."""
+        db = ShardedJSONDatabaseManager(str(self.db_path), shards=4)
+        with db.transaction():
+            db.update({f"key_{i}": i for i in range(10)})
+        with self.assertRaises(RuntimeError):
+            with db.transaction():
+                db.clear()
+                raise RuntimeError("abort")
+
+        reopened = ShardedJSONDatabaseManager(str(self.db_path), shards=4)
+        self.assertEqual(reopened.get_all(), {f"key_{i}": i for i in range(10)})
+
+    def test_conditional_write_with_matching_hash(self):
+        """A write should succeed when the value is unchanged since it was read."""
+        self.db.set("recent_files", ["a.txt"])
+        recent, token = self.db.get_with_hash("recent_files")
+
+        self.assertTrue(self.db.cas("recent_files", recent + ["b.txt"], token))
+        self.assertEqual(self.db.get("recent_files"), ["a.txt", "b.txt"])
+
+    def test_conditional_write_after_in_place_change(self):
+        """Mutating the value that was read should not make its write stale."""
+        self.db.set("recent_files", ["a.txt"])
+        recent, token = self.db.get_with_hash("recent_files")
+        recent.append("b.txt")
+
+        self.assertTrue(self.db.cas("recent_files", recent, token))
+        self.assertFalse(self.db.cas("recent_files", recent, token))
+        self.assertEqual(self.db.get("recent_files"), ["a.txt", "b.txt"])
+
+    def test_conditional_write_rejects_stale_hash(self):
+        """A write should be rejected when the value changed since it was read."""
+        self.db.set("recent_files", ["a.txt"])
+        _, token = self.db.get_with_hash("recent_files")
+        self.db.set("recent_files", ["other.txt"])
+
+        self.assertFalse(self.db.cas("recent_files", ["b.txt"], token))
+        with self.assertRaises(StalePrecondition):
+            self.db.update({"recent_files": []}, expected_hashes={"recent_files": token})
+        with self.assertRaises(StalePrecondition):
+            self.db.delete("recent_files", expected_hash=token)
+        self.assertEqual(self.db.get("recent_files"), ["other.txt"])
+
+    def test_conditional_write_on_missing_key(self):
+        """A None hash should only allow writing a key that does not exist."""
+        self.assertEqual(self.db.get_with_hash("theme", "light"), ("light", None))
+        self.assertTrue(self.db.cas("theme", "dark", None))
+        self.assertFalse(self.db.cas("theme", "blue", None))
+
+    def test_stale_snapshot_does_not_overwrite_newer_one(self):
+        """A snapshot taken earlier must not replace one written after it."""
+        self.db._write_payload(b'{"version": 2}', seq=2)
+        self.db._write_payload(b'{"version": 1}', seq=1)
+
+        new_db = JSONDatabaseManager(str(self.db_path))
+        self.assertEqual(new_db.get("version"), 2)
+
+    def test_large_database_is_streamed_identically(self):
+        """Streamed writes should produce the same file as one-shot writes."""
+        data = {f"key_{i}": {"index": i, "tags": ["a", "b"]} for i in range(50)}
+        self.db.update(data)
+        one_shot = self.db_path.read_bytes()
+
+        streamed_path = self.temp_dir / "streamed.json"
+        streamed_db = JSONDatabaseManager(str(streamed_path))
+        streamed_db._stream_threshold = 10
+        streamed_db.update(data)
+        self.assertEqual(streamed_path.read_bytes(), one_shot)
+
+        pretty_path = self.temp_dir / "pretty.json"
+        pretty_db = JSONDatabaseManager(str(pretty_path), pretty=True)
+        pretty_db.update(data)
+        pretty_one_shot = pretty_path.read_bytes()
+        pretty_db.clear()
+        pretty_db._stream_threshold = 10
+        pretty_db.update(data)
+        self.assertEqual(pretty_path.read_bytes(), pretty_one_shot)
+        self.assertEqual(JSONDatabaseManager(str(streamed_path)).get_all(), data)
+
+    def test_failed_streamed_write_removes_temp_file(self):
+        """A value that cannot be encoded should not leave a temp file behind."""
+        self.db.update({f"key_{i}": i for i in range(300)})
+
+        with self.assertRaises(TypeError):
+            self.db.set("bad", object())
+        self.assertFalse(Path(str(self.db_path) + ".tmp").exists())
+
+    def test_compact_output_by_default(self):
+        """Files should be compact unless pretty output is requested."""
+        self.db.set("window_size", {"width": 1280})
+        self.assertEqual(self.db_path.read_bytes(), b'{"window_size":{"width":1280}}')
+
+        pretty_path = self.temp_dir / "pretty.json"
+        JSONDatabaseManager(str(pretty_path), pretty=True).set("window_size", {"width": 1280})
+        self.assertEqual(
+            pretty_path.read_bytes(),
+            b'{\n  "window_size": {\n    "width": 1280\n  }\n}',
+        )
+
+    def test_writes_after_close_still_persist(self):
+        """Closing should release handles without breaking later writes."""
+        self.db.set("theme", "dark")
+        self.db.close()
+        self.db.set("language", "en")
+
+        new_db = JSONDatabaseManager(str(self.db_path))
+        self.assertEqual(new_db.get_all(), {"theme": "dark", "language": "en"})
+        self.assertEqual(sorted(p.name for p in self.temp_dir.iterdir()), ["test_db.json"])
+
+    def test_closed_debounced_database_can_be_collected(self):
+        """close() should drop the exit hook that keeps the instance alive."""
+        db = JSONDatabaseManager(str(self.db_path), flush_interval=60)
+        db.set("theme", "dark")
+        db.close()
+        ref = weakref.ref(db)
+        del db
+        gc.collect()
+
+        self.assertIsNone(ref())
+
+    @unittest.skipUnless(hasattr(os, "posix_fadvise"), "posix_fadvise is unavailable")
+    def test_drop_cache_after_write(self):
+        """Written files should be evicted from the page cache when asked to."""
+        with mock.patch.object(os, "posix_fadvise", wraps=os.posix_fadvise) as fadvise:
+            db = JSONDatabaseManager(str(self.db_path), drop_cache_after_write=True)
+            db.set("theme", "dark")
+            self.assertEqual(fadvise.call_count, 1)
+            db._stream_threshold = 0
+            db.set("language", "en")
+            self.assertEqual(fadvise.call_count, 2)
+            for call in fadvise.call_args_list:
+                self.assertEqual(call.args[1:], (0, 0, os.POSIX_FADV_DONTNEED))
+
+            fadvise.reset_mock()
+            self.db.set("theme", "dark")
+            self.db._stream_threshold = 0
+            self.db.set("language", "en")
+            fadvise.assert_not_called()
+
+        new_db = JSONDatabaseManager(str(self.db_path))
+        self.assertEqual(new_db.get_all(), {"theme": "dark", "language": "en"})
+
+    def test_schema_encoder_matches_general_encoder(self):
+        """The generated encoder should emit the same JSON as the general one."""
+        schema = {"theme": str, "width": int, "auto_save": bool, "window": dict}
+        data = {"theme": "dark \"é\"", "width": 1280, "auto_save": True, "window": {"x": 1}}
+        for orjson in (json_database_manager.orjson, None):
+            with mock.patch.object(json_database_manager, "orjson", orjson):
+                encode = json_database_manager._compile_schema_encoder(schema)
+                dumps = json_database_manager._dumps
+                self.assertEqual(encode(data), dumps(data))
+                # Mismatched types and key sets fall back to the general encoder.
+                self.assertEqual(encode({**data, "width": True}), dumps({**data, "width": True}))
+                self.assertEqual(encode({"theme": "x"}), dumps({"theme": "x"}))
+                self.assertEqual(encode({**data, "extra": 1}), dumps({**data, "extra": 1}))
+
+    def test_schema_database_round_trip(self):
+        """A database with a schema should persist like any other."""
+        with mock.patch.object(json_database_manager, "orjson", None):
+            db = JSONDatabaseManager(
+                str(self.db_path), schema={"theme": str, "width": int}
+            )
+            db.update({"width": 1280, "theme": "dark"})
+            db.set("extra", [1, 2])
+
+        new_db = JSONDatabaseManager(str(self.db_path))
+        self.assertEqual(new_db.get_all(), {"theme": "dark", "width": 1280, "extra": [1, 2]})
+
+    def test_invalid_schema_is_rejected(self):
+        """A malformed schema should fail whether or not orjson is installed."""
+        for orjson in (json_database_manager.orjson, None):
+            with mock.patch.object(json_database_manager, "orjson", orjson):
+                for schema in ({1: int}, {"width": "int"}):
+                    with self.subTest(orjson=orjson, schema=schema):
+                        with self.assertRaises(TypeError):
+                            JSONDatabaseManager(str(self.db_path), schema=schema)
+
+    def test_unicode_and_non_string_keys_persist(self):
+        """Non-ASCII text and nested non-string keys should survive a reload."""
+        self.db.set("greeting", "olá, mundo")
+        self.db.set("sizes", {1: "small"})
+
+        new_db = JSONDatabaseManager(str(self.db_path))
+        self.assertEqual(new_db.get("greeting"), "olá, mundo")
+        self.assertEqual(new_db.get("sizes"), {"1": "small"})
+
+    def test_loads_file_written_by_stdlib_json(self):
+        """Files written with the json module should load unchanged."""
+        self.db_path.write_text(
+            json.dumps({"keep": 1, "x": float("nan"), "big": 2**70}, indent=4),
+            encoding="utf-8",
+        )
+
+        db = JSONDatabaseManager(str(self.db_path))
+        self.assertEqual(db.get("keep"), 1)
+        self.assertTrue(math.isnan(db.get("x")))
+        self.assertEqual(db.get("big"), 2**70)
+
+    def test_non_finite_floats_and_big_ints_persist(self):
+        """Values orjson cannot encode faithfully should round-trip."""
+        self.db.update({"inf": float("inf"), "big": 2**70, "none": None})
+
+        new_db = JSONDatabaseManager(str(self.db_path))
+        self.assertEqual(new_db.get("inf"), float("inf"))
+        self.assertEqual(new_db.get("big"), 2**70)
+        self.assertIsNone(new_db.get("none"))
+
+    def test_values_json_cannot_encode_are_rejected(self):
+        """Types the json module rejects should fail with or without orjson."""
+        for orjson in (json_database_manager.orjson, None):
+            with mock.patch.object(json_database_manager, "orjson", orjson):
+                for value in (datetime(2024, 1, 1), Point(1, 2)):
+                    with self.subTest(orjson=orjson, value=value):
+                        db = JSONDatabaseManager(str(self.temp_dir / "typed.json"))
+                        with self.assertRaises(TypeError):
+                            db.set("value", value)
+
+    def test_uuid_values_match_json_module(self):
+        """UUIDs should be rejected like the json module does, not stringified."""
+        with self.assertRaises(TypeError):
+            self.db.set("id", uuid.uuid4())
+
     def test_invalid_json_file_recovery(self):
         """Should recover gracefully from invalid JSON file."""
         # Write invalid JSON manually
@@ -94,6 +434,298 @@ class TestJSONDatabaseManager(unittest.TestCase):
         for i in range(20):
             self.assertEqual(self.db.get(f"key_{i}"), i)
 
+    def test_debounced_writes_are_coalesced(self):
+        """Debounced mutations should only reach disk after a flush."""
+        db = JSONDatabaseManager(str(self.db_path), flush_interval=60)
+        db.set("a", 1)
+        db.update({"b": 2})
+        self.assertFalse(self.db_path.exists())
+
+        db.flush()
+        new_db = JSONDatabaseManager(str(self.db_path))
+        self.assertEqual(new_db.get_all(), {"a": 1, "b": 2})
+
+    def test_sync_write_bypasses_debounce(self):
+        """sync=True should persist immediately even when debounced."""
+        db = JSONDatabaseManager(str(self.db_path), flush_interval=60)
+        db.set("theme", "dark", sync=True)
+
+        new_db = JSONDatabaseManager(str(self.db_path))
+        self.assertEqual(new_db.get("theme"), "dark")
+
+    def test_readers_do_not_block_each_other(self):
+        """A reader should not wait for another reader to finish."""
+        self.db.set("theme", "dark")
+        holding = threading.Event()
+        release = threading.Event()
+
+        def slow_reader():
+            with self.db._lock.read:
+                holding.set()
+                release.wait(5)
+
+        reader = threading.Thread(target=slow_reader)
+        reader.start()
+        holding.wait(5)
+        result = []
+        getter = threading.Thread(target=lambda: result.append(self.db.get("theme")))
+        getter.start()
+        getter.join(5)
+        release.set()
+        reader.join()
+
+        self.assertEqual(result, ["dark"])
+
+    def test_thread_safety_mixed_reads_and_writes(self):
+        """Concurrent readers and writers should not lose updates."""
+        def writer(i):
+            self.db.set(f"key_{i}", i)
+
+        def reader(i):
+            self.db.get(f"key_{i}")
+            self.db.get_all()
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(20)]
+        threads += [threading.Thread(target=reader, args=(i,)) for i in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(self.db.get_all(), {f"key_{i}": i for i in range(20)})
+
+    def test_journal_replays_operations_on_startup(self):
+        """Journaled mutations should be recovered without compaction."""
+        db = JSONDatabaseManager(str(self.db_path), journal=True)
+        db.update({"a": 1, "b": 2, "notes": "x" * 200})
+        db.compact()
+        db.set("a", 10)
+        db.delete("b")
+
+        # The JSON file is untouched until the journal is compacted.
+        self.assertIn(b'"b"', self.db_path.read_bytes())
+        new_db = JSONDatabaseManager(str(self.db_path), journal=True)
+        self.assertEqual(new_db.get_all(), {"a": 10, "notes": "x" * 200})
+
+    def test_journal_ignores_torn_final_record(self):
+        """A partially written last record should be discarded on replay."""
+        db = JSONDatabaseManager(str(self.db_path), journal=True)
+        db.set("a", 1)
+        db.compact()
+        db.set("b", 2)
+        with open(str(self.db_path) + ".log", "ab") as log:
+            log.write(b'{"op":"set","k":"c"')
+
+        new_db = JSONDatabaseManager(str(self.db_path))
+        self.assertEqual(new_db.get_all(), {"a": 1, "b": 2})
+        self.assertFalse(Path(str(self.db_path) + ".log").exists())
+
+    def test_journal_failed_append_is_retried_without_tearing(self):
+        """A partially written chunk should not hide records appended later."""
+        db = JSONDatabaseManager(str(self.db_path), journal=True)
+        db.update({"notes": "x" * 200})
+        db.compact()
+
+        def short_write(fd, chunk):
+            os.write(fd, chunk[:5])
+            raise OSError("disk full")
+
+        with mock.patch.object(db._journal_backend, "append", short_write):
+            with self.assertRaises(IOError):
+                db.set("a", 1)
+        db.set("b", 2)
+
+        new_db = JSONDatabaseManager(str(self.db_path))
+        self.assertEqual(new_db.get_all(), {"notes": "x" * 200, "a": 1, "b": 2})
+
+    def test_lazy_database_decodes_values_on_demand(self):
+        """Lazy mode should serve reads without loading the whole file."""
+        self.db.update({"theme": "dark", "window": {"width": 1280, "title": "a, }b"}})
+
+        lazy_db = LazyJSONDatabaseManager(str(self.db_path))
+        self.assertEqual(lazy_db.get("window"), {"width": 1280, "title": "a, }b"})
+        self.assertTrue(lazy_db.exists("theme"))
+        self.assertFalse(lazy_db.exists("missing"))
+        self.assertEqual(lazy_db.get("missing", "default"), "default")
+        self.assertIsNone(lazy_db._data)
+
+    def test_lazy_database_materializes_on_write(self):
+        """Mutating a lazy database should keep every stored value."""
+        self.db.update({"theme": "dark", "language": "en"})
+
+        lazy_db = LazyJSONDatabaseManager(str(self.db_path))
+        recent = lazy_db.get("recent_files", [])
+        recent.append("notes.txt")
+        lazy_db.set("recent_files", recent)
+
+        new_db = JSONDatabaseManager(str(self.db_path))
+        self.assertEqual(
+            new_db.get_all(),
+            {"theme": "dark", "language": "en", "recent_files": ["notes.txt"]},
+        )
+
+    def test_lazy_database_load_data(self):
+        """load_data should return the decoded file and keep the index."""
+        self.db.update({"theme": "dark", "width": 1280})
+
+        lazy_db = LazyJSONDatabaseManager(str(self.db_path))
+        self.assertEqual(lazy_db.load_data(), {"theme": "dark", "width": 1280})
+        self.assertEqual(lazy_db.get("width"), 1280)
+        self.assertIsNone(lazy_db._data)
+
+    def test_lazy_database_reads_during_materialization(self):
+        """Lazy reads should stay correct while another thread loads the file."""
+        self.db.update({f"key{i}": i for i in range(2000)})
+        errors = []
+
+        def reader(lazy_db, start):
+            try:
+                for i in range(start, 2000, 7):
+                    self.assertTrue(lazy_db.exists(f"key{i}"))
+                    self.assertEqual(lazy_db.get(f"key{i}"), i)
+            except Exception as e:
+                errors.append(e)
+
+        # Switch threads as often as possible to provoke the interleaving.
+        interval = sys.getswitchinterval()
+        self.addCleanup(sys.setswitchinterval, interval)
+        sys.setswitchinterval(1e-6)
+        for _ in range(20):
+            lazy_db = LazyJSONDatabaseManager(str(self.db_path))
+            threads = [
+                threading.Thread(target=reader, args=(lazy_db, n)) for n in range(4)
+            ]
+            for t in threads:
+                t.start()
+            self.assertEqual(len(lazy_db.get_all()), 2000)
+            for t in threads:
+                t.join()
+
+        self.assertEqual(errors, [])
+
+    def test_lazy_database_invalid_file_recovery(self):
+        """Lazy mode should recover gracefully from an invalid JSON file."""
+        invalid = (
+            "{ invalid json",
+            '{"a"}',
+            '{"a", "b": 1}',
+            '{"a": tru, "b": 1}',
+            '{"a":1} trailing',
+            '{"a": }',
+            '{"a":1 "b":2}',
+            '{"a":1,}',
+        )
+        for content in invalid:
+            with self.subTest(content=content):
+                self.db_path.write_text(content, encoding="utf-8")
+
+                lazy_db = LazyJSONDatabaseManager(str(self.db_path))
+                lazy_db.set("x", 1)
+                self.assertEqual(lazy_db.get_all(), {"x": 1})
+
+    def test_sharded_database_basic_operations(self):
+        """The sharded manager should behave like a single database."""
+        db = ShardedJSONDatabaseManager(str(self.db_path), shards=4)
+        db.update({f"key_{i}": i for i in range(20)})
+        db.set("theme", "dark")
+        self.assertTrue(db.delete("key_0"))
+        self.assertFalse(db.exists("key_0"))
+
+        expected = {f"key_{i}": i for i in range(1, 20)}
+        expected["theme"] = "dark"
+        self.assertEqual(db.get_all(), expected)
+        self.assertEqual(len(list(self.temp_dir.glob("test_db.*.json"))), 4)
+
+        reopened = ShardedJSONDatabaseManager(str(self.db_path), shards=4)
+        self.assertEqual(reopened.get_all(), expected)
+        self.assertIs(reopened.get_all(), reopened.get_all())
+        reopened.set("theme", "light")
+        self.assertEqual(reopened.get("theme"), reopened.get_all()["theme"])
+
+    def test_sharded_database_survives_shard_count_change(self):
+        """Reopening with fewer or more shards should keep every key."""
+        data = {f"key_{i}": i for i in range(30)}
+        ShardedJSONDatabaseManager(str(self.db_path), shards=8).update(data)
+
+        fewer = ShardedJSONDatabaseManager(str(self.db_path), shards=3)
+        self.assertEqual(fewer.get_all(), data)
+        self.assertEqual(len(list(self.temp_dir.glob("test_db.*.json"))), 3)
+
+        more = ShardedJSONDatabaseManager(str(self.db_path), shards=5)
+        self.assertEqual(more.get_all(), data)
+        for index, shard in enumerate(more._shards):
+            for key in shard.get_all():
+                self.assertEqual(more._shard_index(key), index)
+
+    def test_sharded_rebalance_persists_before_removing_shards(self):
+        """Moved keys should be on disk even when writes are debounced."""
+        data = {f"key_{i}": i for i in range(30)}
+        ShardedJSONDatabaseManager(str(self.db_path), shards=8).update(data)
+
+        ShardedJSONDatabaseManager(str(self.db_path), shards=3, flush_interval=60)
+
+        reopened = ShardedJSONDatabaseManager(str(self.db_path), shards=3)
+        self.assertEqual(reopened.get_all(), data)
+
+    def test_pickle_backend_round_trip(self):
+        """The pickle backend should persist data and export readable JSON."""
+        db = JSONDatabaseManager(str(self.db_path), binary_backend="pickle")
+        db.set("window_size", {"width": 1280, "height": 800})
+
+        new_db = JSONDatabaseManager(str(self.db_path), binary_backend="pickle")
+        self.assertEqual(new_db.get("window_size"), {"width": 1280, "height": 800})
+
+        export_path = self.temp_dir / "export.json"
+        new_db.export_json(str(export_path))
+        self.assertEqual(
+            JSONDatabaseManager(str(export_path)).get_all(),
+            {"window_size": {"width": 1280, "height": 800}},
+        )
+
+    @unittest.skipUnless(json_database_manager.msgpack, "msgpack is not installed")
+    def test_msgpack_backend_round_trip(self):
+        """The msgpack backend should persist data across reloads."""
+        db = JSONDatabaseManager(str(self.db_path), binary_backend="msgpack")
+        db.update({"theme": "dark", "recent_files": ["a.txt"]})
+
+        new_db = JSONDatabaseManager(str(self.db_path), binary_backend="msgpack")
+        self.assertEqual(new_db.get_all(), {"theme": "dark", "recent_files": ["a.txt"]})
+
+    def test_journal_requires_json_backend(self):
+        """The JSON-only journal should not be combined with a binary backend."""
+        with self.assertRaises(ValueError):
+            JSONDatabaseManager(str(self.db_path), journal=True, binary_backend="pickle")
+
+    def test_journal_rejected_value_leaves_data_unchanged(self):
+        """A value the journal cannot encode should not be applied."""
+        db = JSONDatabaseManager(str(self.db_path), journal=True)
+        db.set("a", 1)
+
+        with self.assertRaises(TypeError):
+            db.set("a", object())
+        self.assertEqual(db.get_all(), {"a": 1})
+
+    def test_invalid_binary_file_recovery(self):
+        """A corrupted binary snapshot should be treated as empty."""
+        for payload in (b"not a pickle", b"\x80\x05c__main__\nNope\n.", b"\x80\x05]\x94."):
+            with self.subTest(payload=payload):
+                self.db_path.write_bytes(payload)
+
+                db = JSONDatabaseManager(str(self.db_path), binary_backend="pickle")
+                self.assertEqual(db.get_all(), {})
+
+    @unittest.skipUnless(json_database_manager.liburing, "liburing is not installed")
+    def test_uring_backend_appends_and_syncs(self):
+        """The io_uring journal backend should append chunks in order."""
+        backend = json_database_manager._LinuxUringBackend()
+        log_path = self.temp_dir / "uring.log"
+        with open(log_path, "ab", buffering=0) as log:
+            backend.append(log.fileno(), b"first\n")
+            backend.append(log.fileno(), b"second\n")
+        backend.close()
+
+        self.assertEqual(log_path.read_bytes(), b"first\nsecond\n")
+
 
 if __name__ == "__main__":
     unittest.main()